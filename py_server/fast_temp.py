@@ -1,6 +1,11 @@
+import asyncio
 import logging
+import os
+import sys
+import time
 import httpx
 import json
+from functools import lru_cache
 from typing import List, Optional
 from datetime import date, datetime
 
@@ -22,6 +27,14 @@ DB_CONFIG = {
     "password": "ubuntu",
     "database": "postgres"
 }
+# 워커마다 풀을 따로 만들므로 최소 연결 수는 작게, 연결 대기는 짧게 잡습니다.
+DB_POOL_OPTIONS = {
+    "min_size": 1,
+    "max_size": 10,
+    "timeout": 5.0,
+}
+# 풀 생성에 실패하면 이 시간(초) 동안은 다시 연결하지 않고 같은 오류를 바로 돌려줍니다.
+DB_POOL_RETRY_DELAY = 5.0
 
 # --- Pydantic Models ---
 class Equipment(BaseModel):
@@ -57,19 +70,118 @@ class CompanyCreate(BaseModel):
     maintenance_end_date: Optional[date] = None
     equipment: List[EquipmentCreate] = []
 
-# --- Database Pool ---
-db_pool = None
+# --- Per-worker State ---
+# 멀티 워커 모드에서는 워커마다 모듈을 새로 import 하므로 아래 객체들은 워커별로 하나씩 존재합니다.
+# import 시점에 원격 DB에 연결하지 않도록 처음 사용할 때 생성하고, 종료 시 정리합니다.
+db_pool: Optional[asyncpg.Pool] = None
+_db_pool_creating: Optional[asyncio.Task] = None
+_db_pool_error: Optional[Exception] = None
+_db_pool_retry_at = 0.0
+_db_pool_warmup: Optional[asyncio.Task] = None
+nxapi_client: Optional[httpx.AsyncClient] = None
+
+async def _create_db_pool() -> asyncpg.Pool:
+    """DB 풀을 한 번 생성합니다. get_db_pool()을 동시에 호출한 요청들은 모두 이 작업 하나를 기다립니다."""
+    global db_pool, _db_pool_creating, _db_pool_error, _db_pool_retry_at
+    try:
+        db_pool = await asyncpg.create_pool(**DB_CONFIG, **DB_POOL_OPTIONS)
+        _db_pool_error = None
+        logger.info(f"Worker {os.getpid()}: Database pool created")
+        return db_pool
+    except Exception as e:
+        _db_pool_error = e
+        _db_pool_retry_at = time.monotonic() + DB_POOL_RETRY_DELAY
+        logger.error(f"Worker {os.getpid()}: Database pool creation failed: {str(e)}")
+        raise
+    finally:
+        # 작업이 끝난 뒤에만 비워야 이후 요청이 새로 시도할 수 있습니다.
+        _db_pool_creating = None
+
+async def get_db_pool() -> asyncpg.Pool:
+    """워커의 DB 풀을 반환합니다. 없으면 처음 호출될 때 생성합니다.
+
+    생성 중에 들어온 요청은 진행 중인 작업을 함께 기다리고 같은 풀 또는 같은 오류를 받습니다.
+    생성에 실패하면 DB_POOL_RETRY_DELAY 동안은 재시도 없이 마지막 오류를 바로 돌려줍니다.
+    """
+    global _db_pool_creating
+    if db_pool is not None:
+        return db_pool
+    if _db_pool_creating is None:
+        if _db_pool_error is not None and time.monotonic() < _db_pool_retry_at:
+            raise _db_pool_error
+        _db_pool_creating = asyncio.create_task(_create_db_pool())
+        # 기다리는 요청이 모두 끊겨도 "exception was never retrieved" 경고가 남지 않도록 처리
+        _db_pool_creating.add_done_callback(lambda task: task.cancelled() or task.exception())
+    # 요청 하나가 취소되어도 다른 요청이 기다리는 생성 작업은 계속되도록 shield로 감쌉니다.
+    return await asyncio.shield(_db_pool_creating)
+
+async def warm_up_db_pool() -> None:
+    """서버 시작을 막지 않고 백그라운드에서 DB 풀을 미리 생성합니다."""
+    try:
+        await get_db_pool()
+    except Exception:
+        # 오류는 _create_db_pool()에서 이미 기록했습니다.
+        pass
+
+def get_nxapi_client() -> httpx.AsyncClient:
+    """워커의 NX-API 클라이언트를 반환합니다. 연결을 재사용하기 위해 워커당 하나만 생성합니다."""
+    global nxapi_client
+    if nxapi_client is None or nxapi_client.is_closed:
+        nxapi_client = httpx.AsyncClient(
+            auth=(NXAPI_USERNAME, NXAPI_PASSWORD),
+            verify=False
+        )
+    return nxapi_client
+
+def process_uptime() -> Optional[float]:
+    """프로세스가 시작된 뒤 지난 시간(초)을 반환합니다. /proc가 없는 OS에서는 None."""
+    try:
+        with open("/proc/self/stat") as f:
+            # 프로세스 이름에 공백이 있을 수 있으므로 마지막 ')' 뒤부터 필드를 셉니다 (starttime은 22번째 필드)
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+    except OSError:
+        return None
+    return system_uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+def peak_rss_mb() -> Optional[float]:
+    """현재 프로세스의 최대 메모리 사용량(MB)을 반환합니다. 지원하지 않는 OS에서는 None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global db_pool
-    db_pool = await asyncpg.create_pool(**DB_CONFIG)
-    logger.info("Database pool created")
+    global db_pool, nxapi_client, _db_pool_creating, _db_pool_error, _db_pool_warmup
+    _db_pool_warmup = asyncio.create_task(warm_up_db_pool())
+    uptime = process_uptime()
+    rss = peak_rss_mb()
+    uptime_text = f"{uptime:.2f}s" if uptime is not None else "N/A"
+    rss_text = f"{rss:.1f} MB" if rss is not None else "N/A"
+    logger.info(f"Worker {os.getpid()}: ready {uptime_text} after process start (peak RSS {rss_text})")
     yield
     # Shutdown
-    await db_pool.close()
-    logger.info("Database pool closed")
+    for task in (_db_pool_warmup, _db_pool_creating):
+        if task is not None and not task.done():
+            task.cancel()
+    await asyncio.gather(*(t for t in (_db_pool_warmup, _db_pool_creating) if t is not None), return_exceptions=True)
+    # 작업은 현재 이벤트 루프에 묶이므로 다음 실행을 위해 풀과 함께 초기화합니다.
+    _db_pool_warmup = None
+    _db_pool_creating = None
+    _db_pool_error = None
+    if nxapi_client is not None:
+        await nxapi_client.aclose()
+        nxapi_client = None
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
+        logger.info(f"Worker {os.getpid()}: Database pool closed")
 
 app = FastAPI(lifespan=lifespan)
 
@@ -89,6 +201,8 @@ NXAPI_PASSWORD = "Admin_1234!"
 NXAPI_ENDPOINT = f"{NXAPI_HOST}/ins"
 
 # --- Helper Functions ---
+# 순수 함수라 워커별 캐시가 서로 어긋날 일이 없습니다.
+@lru_cache(maxsize=1024)
 def extract_city_from_address(address: str) -> str:
     """주소에서 도시명을 추출합니다."""
     # 광역시, 도, 특별시 등을 찾아서 추출
@@ -163,7 +277,8 @@ async def get_test_page():
 async def get_companies():
     """모든 회사 정보와 장비 정보를 가져옵니다."""
     try:
-        async with db_pool.acquire() as connection:
+        pool = await get_db_pool()
+        async with pool.acquire() as connection:
             # 회사 정보 가져오기
             companies_query = """
                 SELECT company_id, name, address, phone, 
@@ -226,7 +341,8 @@ async def get_companies():
 async def get_company(company_id: int):
     """특정 회사의 상세 정보를 가져옵니다."""
     try:
-        async with db_pool.acquire() as connection:
+        pool = await get_db_pool()
+        async with pool.acquire() as connection:
             # 회사 정보 가져오기
             company_query = """
                 SELECT company_id, name, address, phone,
@@ -291,7 +407,8 @@ async def get_company(company_id: int):
 async def get_cities():
     """모든 도시 목록을 가져옵니다."""
     try:
-        async with db_pool.acquire() as connection:
+        pool = await get_db_pool()
+        async with pool.acquire() as connection:
             # 주소에서 도시를 추출하여 중복 제거
             query = """
                 SELECT DISTINCT address
@@ -315,7 +432,8 @@ async def get_cities():
 async def create_company(company_data: CompanyCreate):
     """새로운 회사와 장비 정보를 생성합니다."""
     try:
-        async with db_pool.acquire() as connection:
+        pool = await get_db_pool()
+        async with pool.acquire() as connection:
             # 트랜잭션 시작
             async with connection.transaction():
                 # 1. 회사 정보 삽입
@@ -406,39 +524,36 @@ async def execute_real_nxapi_command(command: str) -> str:
     logger.info(f"Attempting NX-API call with username: {NXAPI_USERNAME}")
 
     try:
-        async with httpx.AsyncClient(
-            auth=(NXAPI_USERNAME, NXAPI_PASSWORD),
-            verify=False
-        ) as client:
-            logger.info(f"Sending NX-API command to {NXAPI_ENDPOINT}: {command}")
-            response = await client.post(NXAPI_ENDPOINT, json=payload, headers=headers, timeout=15.0)
+        client = get_nxapi_client()
+        logger.info(f"Sending NX-API command to {NXAPI_ENDPOINT}: {command}")
+        response = await client.post(NXAPI_ENDPOINT, json=payload, headers=headers, timeout=15.0)
+        
+        if response.status_code == 401:
+            logger.error(f"NX-API Authentication Failed (401). Response headers: {response.headers}")
+        
+        response.raise_for_status() 
+
+        response_data = response.json()
+
+        if "result" in response_data and response_data["result"] and "body" in response_data["result"]:
+            body_content = response_data["result"]["body"]
             
-            if response.status_code == 401:
-                logger.error(f"NX-API Authentication Failed (401). Response headers: {response.headers}")
-            
-            response.raise_for_status() 
-
-            response_data = response.json()
+            logger.debug(f"NX-API response body type: {type(body_content)}")
+            logger.debug(f"NX-API response body content: {body_content}")
 
-            if "result" in response_data and response_data["result"] and "body" in response_data["result"]:
-                body_content = response_data["result"]["body"]
-                
-                logger.debug(f"NX-API response body type: {type(body_content)}")
-                logger.debug(f"NX-API response body content: {body_content}")
-
-                if isinstance(body_content, str):
-                    return body_content
-                elif isinstance(body_content, (dict, list)):
-                    return json.dumps(body_content, indent=2, ensure_ascii=False)
-                else:
-                    return str(body_content)
-                    
-            elif "error" in response_data and response_data["error"]:
-                error_info = response_data["error"]
-                return f"NX-API Error: {error_info.get('message', 'Unknown error')} (Code: {error_info.get('code', 'N/A')})\nData: {error_info.get('data', '')}"
+            if isinstance(body_content, str):
+                return body_content
+            elif isinstance(body_content, (dict, list)):
+                return json.dumps(body_content, indent=2, ensure_ascii=False)
             else:
-                return "NX-API Error: Unknown response format."
+                return str(body_content)
                 
+        elif "error" in response_data and response_data["error"]:
+            error_info = response_data["error"]
+            return f"NX-API Error: {error_info.get('message', 'Unknown error')} (Code: {error_info.get('code', 'N/A')})\nData: {error_info.get('data', '')}"
+        else:
+            return "NX-API Error: Unknown response format."
+            
     except httpx.HTTPStatusError as e:
         logger.error(f"NX-API HTTPStatusError: {e.response.status_code} - {e.response.text}")
         return f"NX-API HTTP Error: {e.response.status_code} - Review credentials and server response. Response: {e.response.text}"
@@ -505,5 +620,6 @@ async def websocket_endpoint(websocket: WebSocket, device_id: str = Path(...)):
 
 
 if __name__ == "__main__":
+    # 멀티 워커/자동 재시작은 run.py를 사용하세요.
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,44 @@
+"""fast_temp 서버 실행기.
+
+워커 프로세스는 spawn 방식으로 시작되면서 실행한 스크립트를 한 번 더 import 합니다.
+앱 모듈에서 직접 실행하면 워커마다 앱이 두 번 로드되므로, 실행 옵션 처리는 이 파일에서만 합니다.
+"""
+import argparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="FastAPI NX-API backend")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "1")),
+                        help="워커 프로세스 수 (기본값: WEB_CONCURRENCY 또는 1)")
+    parser.add_argument("--reload", action="store_true", help="코드 변경 시 자동 재시작 (개발용, 단일 워커)")
+    args = parser.parse_args()
+
+    if args.reload and args.workers > 1:
+        logger.warning("--reload is only supported with a single worker; ignoring --workers")
+
+    # 멀티 워커 실행 중 `kill -HUP <master pid>`를 보내면 워커를 순서대로 재시작합니다. (uvicorn>=0.30)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    uvicorn.run(
+        "fast_temp:app",
+        host=args.host,
+        port=args.port,
+        workers=1 if args.reload else args.workers,
+        reload=args.reload,
+        app_dir=app_dir,
+        # 실행 위치와 상관없이 백엔드 디렉터리만 감시 (레포 루트의 node_modules 등 제외)
+        reload_dirs=[app_dir] if args.reload else None,
+        timeout_graceful_shutdown=30,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()